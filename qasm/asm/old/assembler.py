@@ -328,7 +328,7 @@ class CodeSection(SizedSection["code"]):
                 args.append(func.num_params)
                 args.append(func.num_locals)
             data.extend(inst.to_bytes(types_, *args))
-        return data
+        return bytes(data)
 
 
 class DataSection(SizedSection["data"]):
@@ -12,8 +12,8 @@ class IConfigurable:
 
     class ConfigurationOptionWrapper:
         def __init__(self, owner, *options: "IConfigurable._OptionType", default: bool = False):
-            if not all(map(lambda o: isinstance(o, IConfigurable._OptionType), options)):
-                raise TypeError(f"all options must be instances of {IConfigurable._OptionType}")
+            if not all(map(lambda o: isinstance(o, owner._OptionType), options)):
+                raise TypeError(f"all options must be instances of {owner._OptionType}")
             self._owner = owner
             self._options = options
             self._value = default
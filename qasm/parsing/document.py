@@ -205,24 +205,43 @@ class InstructionArgument:
 
 
 class Instruction:
-    def __init__(self, name: FullyQualifiedName, arguments: Iterable[InstructionArgument]) -> None:
+    def __init__(
+            self,
+            name: FullyQualifiedName,
+            argument_values: Iterable[Union[FullyQualifiedName, Token]] = (),
+            argument_types: Optional[Iterable[Optional[Type]]] = None
+    ) -> None:
         self._name = name
-        self._arguments = tuple(arguments)
+        self._argument_values = tuple(argument_values)
+        if argument_types is None:
+            self._argument_types = (None,) * len(self._argument_values)
+        else:
+            self._argument_types = tuple(argument_types)
+            if len(self._argument_types) != len(self._argument_values):
+                raise ValueError(f"argument_types must have the same length as argument_values")
 
     @property
     def name(self) -> FullyQualifiedName:
         return self._name
 
     @property
-    def arguments(self) -> Tuple[InstructionArgument]:
-        return self._arguments
+    def argument_values(self) -> Tuple[Union[FullyQualifiedName, Token], ...]:
+        return self._argument_values
+
+    @property
+    def argument_types(self) -> Tuple[Optional[Type], ...]:
+        return self._argument_types
+
+    @property
+    def arguments(self) -> Tuple[InstructionArgument, ...]:
+        return tuple(map(InstructionArgument, self._argument_values, self._argument_types))
 
 
 class Label(Instruction):
     declaration_keyword = "label"
 
     def __init__(self, keyword: Token, name: FullyQualifiedName):
-        super().__init__(FullyQualifiedName(keyword), [InstructionArgument(name)])
+        super().__init__(FullyQualifiedName(keyword), [name])
 
 
 class FunctionDefinition(FunctionDeclaration):
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from enum import IntEnum
+from enum import IntEnum, IntFlag
 from typing import Iterable, Optional, Union
 
 try:
@@ -18,16 +18,17 @@ __all__ = [
 ]
 
 
-class TokenizerOptions(IntEnum):
+class TokenizerOptions(IntFlag):
     """
     Defines options for the tokenizer to change the behaviour of the tokenizer at runtime
     """
-    EmitNewLine = 1
-    SkipSpacesBeforeEating = 2
-    EmitWhiteSpace = 3
-    EmitComments = 4
-    IncludeCommentCharacter = 5
-    IncludeCommentEOL = 6
+    EmitNewLine = 1 << 0
+    SkipSpacesBeforeEating = 1 << 1
+    EmitWhiteSpace = 1 << 2
+    EmitComments = 1 << 3
+    IncludeCommentCharacter = 1 << 4
+    IncludeCommentEOL = 1 << 5
+    EmitKeywords = 1 << 6
 
 
 class TokenType(IntEnum):
@@ -40,9 +41,6 @@ class TokenType(IntEnum):
     Dot = 1
     Identifier = 2
 
-    LiteralIndicator_Minimum = 4
-    Literal = LiteralIndicator_Minimum
-
     Literal_Char = 4
     Literal_Int = 5
     Literal_String = 6
@@ -52,7 +50,9 @@ class TokenType(IntEnum):
     Literal_Bytes = 10
     Literal_Hex = 11
 
-    LiteralIndicator_Maximum = 11
+    LiteralIndicator_Minimum = Literal_Char
+    LiteralIndicator_Maximum = Literal_Hex
+    Literal = LiteralIndicator_Minimum
 
     Comma = 20
     LeftCurlyBracket = 21
@@ -64,31 +64,44 @@ class TokenType(IntEnum):
     Equal = 27
     SemiColon = 28
 
+    Keyword_Function = 30
+    Keyword_Variable = 31
+    Keyword_Type = 32
+    Keyword_Import = 33
+
+    KeywordIndicator_Minimum = Keyword_Function
+    KeywordIndicator_Maximum = Keyword_Import
+
     def is_literal(self):
         return self.LiteralIndicator_Minimum <= self <= self.LiteralIndicator_Maximum
 
+    def is_keyword(self):
+        return self.KeywordIndicator_Minimum <= self <= self.KeywordIndicator_Maximum
+
 
 class Token:
-    def __init__(self, line: int, char: int, type: TokenType, value: str = None):
+    __slots__ = ("_line", "_char", "_type", "_value")
+
+    def __init__(self, line: int, char: int, type: TokenType, value: Optional[str] = None) -> None:
         self._line = line
         self._char = char
         self._type = type
         self._value = value
 
     @property
-    def line(self):
+    def line(self) -> int:
         return self._line
 
     @property
-    def char(self):
+    def char(self) -> int:
         return self._char
 
     @property
-    def type(self):
+    def type(self) -> TokenType:
         return self._type
 
     @property
-    def value(self):
+    def value(self) -> Optional[str]:
         return self._value
 
     def __eq__(self, other):
@@ -206,7 +219,29 @@ class UnexpectedTokenError(Exception):
 class ITokenizer(ABC, IConfigurable[TokenizerOptions]):
     """
     An interface for any object that can supply tokens to an object of type `IParser`
+
+    The options are stored as an `int` bit mask of `TokenizerOptions` values.
     """
+    def __init__(self) -> None:
+        super().__init__()
+        self._options = 0
+
+    def options(self, *options: TokenizerOptions):
+        if not len(options):
+            return {option: bool(self._options & option.value) for option in TokenizerOptions}
+        return super().options(*options)
+
+    def __getitem__(self, item: TokenizerOptions) -> bool:
+        return bool(self._options & item.value)
+
+    def __setitem__(self, item: TokenizerOptions, value: bool) -> None:
+        if not isinstance(value, bool):
+            raise TypeError(f"option value must be a bool")
+        if value:
+            self._options |= item.value
+        else:
+            self._options &= ~item.value
+
     @property
     @abstractmethod
     def has_tokens(self) -> bool:
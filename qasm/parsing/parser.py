@@ -1,4 +1,4 @@
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Tuple
 
 try:
     from .iparser import *
@@ -10,6 +10,48 @@ except ImportError:
     from qasm.parsing.itokenizer import *
 
 
+_IMPORT_TYPE_BY_KEYWORD = {
+    TokenType.Keyword_Variable: ImportType.Variable,
+    TokenType.Keyword_Function: ImportType.Function,
+    TokenType.Keyword_Type: ImportType.Type
+}
+
+# keywords are only reserved where a declaration can start, anywhere else they are names
+_NAME_TOKEN_TYPES = frozenset({
+    TokenType.Identifier,
+    TokenType.Keyword_Function,
+    TokenType.Keyword_Variable,
+    TokenType.Keyword_Type,
+    TokenType.Keyword_Import
+})
+
+_EXPECTED_LITERAL = "Literal"
+
+_EXPECTED_IMPORT_DECLARATION = " or ".join(
+    [
+        VariableDeclaration.declaration_keyword,
+        FunctionDeclaration.declaration_keyword,
+        TypeDeclaration.declaration_keyword
+    ]
+)
+
+_EXPECTED_TYPE_MEMBER = " or ".join(
+    [
+        VariableDeclaration.declaration_keyword,
+        FunctionDefinition.declaration_keyword
+    ]
+)
+
+_EXPECTED_DECLARATION = " or ".join(
+    [
+        VariableDefinition.declaration_keyword,
+        FunctionDefinition.declaration_keyword,
+        TypeDefinition.declaration_keyword,
+        ImportStatement.declaration_keyword
+    ]
+)
+
+
 class Parser(IParser):
     @staticmethod
     def _get_token(tokenizer: ITokenizer, value: Union[str, TokenType]) -> Token:
@@ -22,13 +64,28 @@ class Parser(IParser):
             return self._get_token(tokenizer, value)
         return None
 
+    @staticmethod
+    def _get_name(tokenizer: ITokenizer) -> Token:
+        token = tokenizer.token
+        if token.type not in _NAME_TOKEN_TYPES:
+            raise UnexpectedTokenError(TokenType.Identifier, token)
+        tokenizer.eat(token.type)
+        if token.type is not TokenType.Identifier:
+            token = Token(token.line, token.char, TokenType.Identifier, token.value)
+        return token
+
+    def _try_get_name(self, tokenizer: ITokenizer) -> Optional[Token]:
+        if tokenizer.token.type in _NAME_TOKEN_TYPES:
+            return self._get_name(tokenizer)
+        return None
+
     def _try_get_type(self, tokenizer: ITokenizer) -> Optional[Type]:
-        if tokenizer.token == TokenType.Identifier:
+        if tokenizer.token.type in _NAME_TOKEN_TYPES:
             return self._get_type(tokenizer)
         return None
 
     def _get_type(self, tokenizer: ITokenizer) -> Type:
-        type_name = self._get_token(tokenizer, TokenType.Identifier)
+        type_name = self._get_name(tokenizer)
         typ = Type(type_name)
         while tokenizer.token == TokenType.Asterisk:
             typ = Pointer(typ, self._get_token(tokenizer, TokenType.Asterisk))
@@ -36,7 +93,7 @@ class Parser(IParser):
 
     def _get_parameter(self, tokenizer: ITokenizer) -> Parameter:
         typ = self._get_type(tokenizer)
-        name = self._try_get_token(tokenizer, TokenType.Identifier)
+        name = self._try_get_name(tokenizer)
         return Parameter(name, typ)
 
     def _get_parameters(self, tokenizer: ITokenizer) -> List[Parameter]:
@@ -51,23 +108,23 @@ class Parser(IParser):
     def _get_modifiers(self, tokenizer: ITokenizer) -> List[Token]:
         modifiers = []
         while True:
-            modifier = self._try_get_token(tokenizer, TokenType.Identifier)
+            modifier = self._try_get_name(tokenizer)
             if not modifier:
                 break
             modifiers.append(modifier)
         return modifiers
 
     def _get_import_declaration(self, tokenizer: ITokenizer) -> ImportDeclaration:
-        import_type = self._get_token(tokenizer, TokenType.Identifier)
+        keyword = tokenizer.token
+        import_type = _IMPORT_TYPE_BY_KEYWORD.get(keyword.type)
+        if import_type is None:
+            raise UnexpectedTokenError(_EXPECTED_IMPORT_DECLARATION, keyword)
+        tokenizer.eat(keyword.type)
         name = self._get_fully_qualified_name(tokenizer)
-        return ImportDeclaration(import_type, name, {
-            VariableDeclaration.declaration_keyword: ImportType.Variable,
-            FunctionDeclaration.declaration_keyword: ImportType.Function,
-            TypeDeclaration.declaration_keyword: ImportType.Type
-        }[import_type.value])
+        return ImportDeclaration(keyword, name, import_type)
 
     def _get_import_statement(self, tokenizer: ITokenizer) -> ImportStatement:
-        keyword = self._get_token(tokenizer, ImportStatement.declaration_keyword)
+        keyword = self._get_token(tokenizer, TokenType.Keyword_Import)
         modifiers = self._get_modifiers(tokenizer)
         source = self._get_token(tokenizer, TokenType.Literal_String)
         import_statement = ImportStatement(keyword, source, modifiers)
@@ -79,70 +136,76 @@ class Parser(IParser):
 
     def _get_instruction(self, tokenizer: ITokenizer) -> Instruction:
         name = self._get_fully_qualified_name(tokenizer)
-        arguments = self._get_instruction_arguments(tokenizer)
-        return Instruction(name, arguments)
+        values, types = self._get_instruction_arguments(tokenizer)
+        return Instruction(name, values, types)
+
+    def _get_instruction_argument_value(self, tokenizer: ITokenizer) -> Union[FullyQualifiedName, Token]:
+        if tokenizer.token.type in _NAME_TOKEN_TYPES:
+            return self._get_fully_qualified_name(tokenizer)
+        return self._get_literal(tokenizer)
 
-    def _get_instruction_argument(self, tokenizer: ITokenizer) -> InstructionArgument:
-        value = self._get_fully_qualified_name(tokenizer) if tokenizer.token == TokenType.Identifier else self._get_literal(tokenizer)
+    def _get_instruction_argument_type(self, tokenizer: ITokenizer) -> Optional[Type]:
         if self._try_get_token(tokenizer, TokenType.Colon):
-            typ = self._get_type(tokenizer)
-        else:
-            typ = None
-        return InstructionArgument(value, typ)
+            return self._get_type(tokenizer)
+        return None
 
-    def _get_instruction_arguments(self, tokenizer: ITokenizer) -> List[InstructionArgument]:
+    def _get_instruction_arguments(self, tokenizer: ITokenizer) -> Tuple[List[Union[FullyQualifiedName, Token]], List[Optional[Type]]]:
         try:
-            arguments = [self._get_instruction_argument(tokenizer)]
+            values = [self._get_instruction_argument_value(tokenizer)]
+            types = [self._get_instruction_argument_type(tokenizer)]
         except UnexpectedTokenError:
-            return []
+            return [], []
         while self._try_get_token(tokenizer, TokenType.Comma):
-            arguments.append(self._get_instruction_argument(tokenizer))
-        return arguments
+            values.append(self._get_instruction_argument_value(tokenizer))
+            types.append(self._get_instruction_argument_type(tokenizer))
+        return values, types
 
-    def _get_function_signature(self, tokenizer: ITokenizer) -> FunctionDeclaration:
-        keyword = self._get_token(tokenizer, FunctionDeclaration.declaration_keyword)
+    def _get_function_definition(self, tokenizer: ITokenizer, *, allow_modifiers: bool, allow_variable_modifiers: bool) -> FunctionDefinition:
+        keyword = self._get_token(tokenizer, TokenType.Keyword_Function)
         name = self._get_fully_qualified_name(tokenizer)
-        self._get_token(tokenizer, TokenType.LeftCurvyBracket)
+        tokenizer.eat(TokenType.LeftCurvyBracket)
         params = self._get_parameters(tokenizer)
         tokenizer.eat(TokenType.RightCurvyBracket)
         tokenizer.eat(TokenType.Colon)
         return_type = self._get_type(tokenizer)
-        return FunctionDeclaration(keyword, name, params, return_type)
-
-    def _get_function_definition(self, tokenizer: ITokenizer) -> FunctionDefinition:
-        declaration = self._get_function_signature(tokenizer)
-        if self[ParserOptions.AllowFunctionModifiers]:
+        if allow_modifiers:
             modifiers = self._get_modifiers(tokenizer)
         else:
             modifiers = []
-        func = FunctionDefinition(declaration.keyword, declaration.name, declaration.parameters, declaration.return_type_name, modifiers)
+        func = FunctionDefinition(keyword, name, params, return_type, modifiers)
         tokenizer.eat(TokenType.LeftCurlyBracket)
-        while not self._try_get_token(tokenizer, TokenType.RightCurlyBracket):
-            if tokenizer.token == VariableDeclaration.declaration_keyword:
-                func.add_local(self._get_variable_declaration(tokenizer))
+        add_local = func.add_local
+        add_instruction = func.add_instruction
+        while True:
+            token_type = tokenizer.token.type
+            if token_type is TokenType.RightCurlyBracket:
+                tokenizer.advance()
+                break
+            if token_type is TokenType.Keyword_Variable:
+                add_local(self._get_variable_declaration(tokenizer, allow_modifiers=allow_variable_modifiers))
             else:
-                func.add_instruction(self._get_instruction(tokenizer))
+                add_instruction(self._get_instruction(tokenizer))
         return func
 
     def _get_fully_qualified_name(self, tokenizer: ITokenizer) -> FullyQualifiedName:
-        parts = [self._get_token(tokenizer, TokenType.Identifier)]
+        parts = [self._get_name(tokenizer)]
         while self._try_get_token(tokenizer, TokenType.Dot):
-            parts.append(self._get_token(tokenizer, TokenType.Identifier))
+            parts.append(self._get_name(tokenizer))
         return FullyQualifiedName(*parts)
 
     def _get_literal(self, tokenizer: ITokenizer) -> Token:
         if not tokenizer.token.type.is_literal():
-            raise UnexpectedTokenError(TokenType.Literal, tokenizer.token)
+            raise UnexpectedTokenError(_EXPECTED_LITERAL, tokenizer.token)
         return self._get_token(tokenizer, tokenizer.token.type)
 
-    def _get_variable_declaration(self, tokenizer: ITokenizer) -> VariableDeclaration:
-        keyword = self._get_token(tokenizer, VariableDeclaration.declaration_keyword)
+    def _get_variable_declaration(self, tokenizer: ITokenizer, *, allow_modifiers: bool) -> VariableDeclaration:
+        keyword = self._get_token(tokenizer, TokenType.Keyword_Variable)
         name = self._get_fully_qualified_name(tokenizer)
         tokenizer.eat(TokenType.Colon)
         typ = self._get_type(tokenizer)
         if self._try_get_token(tokenizer, TokenType.SemiColon):
             return VariableDeclaration(keyword, name, typ)
-        if self[ParserOptions.AllowVariableModifiers]:
+        if allow_modifiers:
             modifiers = self._get_modifiers(tokenizer)
         else:
             modifiers = []
@@ -151,50 +214,59 @@ class Parser(IParser):
         tokenizer.eat(TokenType.SemiColon)
         return VariableDefinition(keyword, name, typ, modifiers, value)
 
-    def _get_type_definition(self, tokenizer: ITokenizer) -> TypeDefinition:
-        keyword = self._get_token(tokenizer, TypeDefinition.declaration_keyword)
+    def _get_type_definition(self, tokenizer: ITokenizer, *, allow_function_modifiers: bool, allow_variable_modifiers: bool) -> TypeDefinition:
+        keyword = self._get_token(tokenizer, TokenType.Keyword_Type)
         name = self._get_fully_qualified_name(tokenizer)
         modifiers = self._get_modifiers(tokenizer)
         typ = TypeDefinition(keyword, name, modifiers)
         tokenizer.eat(TokenType.LeftCurlyBracket)
-        while not self._try_get_token(tokenizer, TokenType.RightCurlyBracket):
-            if tokenizer.token == VariableDeclaration.declaration_keyword:
-                typ.add_field(self._get_variable_declaration(tokenizer))
-            elif tokenizer.token == FunctionDefinition.declaration_keyword:
-                typ.add_function(self._get_function_definition(tokenizer))
+        while True:
+            token_type = tokenizer.token.type
+            if token_type is TokenType.RightCurlyBracket:
+                tokenizer.advance()
+                break
+            if token_type is TokenType.Keyword_Variable:
+                typ.add_field(self._get_variable_declaration(tokenizer, allow_modifiers=allow_variable_modifiers))
+            elif token_type is TokenType.Keyword_Function:
+                typ.add_function(self._get_function_definition(
+                    tokenizer,
+                    allow_modifiers=allow_function_modifiers,
+                    allow_variable_modifiers=allow_variable_modifiers
+                ))
             else:
-                raise UnexpectedTokenError(" or ".join(
-                    [
-                        VariableDeclaration.declaration_keyword,
-                        FunctionDefinition.declaration_keyword
-                    ]
-                ), tokenizer.token)
+                raise UnexpectedTokenError(_EXPECTED_TYPE_MEMBER, tokenizer.token)
         return typ
 
     def parse(self, tokenizer: ITokenizer) -> Document:
         document = Document()
         tokenizer[TokenizerOptions.EmitComments] = False
+        tokenizer[TokenizerOptions.EmitKeywords] = True
         tokenizer.advance()
         with self.options(ParserOptions.AllowFunctionModifiers, ParserOptions.AllowVariableModifiers).enabled():
+            # the options can't change while parsing, so look them up once instead of once per declaration
+            allow_function_modifiers = self[ParserOptions.AllowFunctionModifiers]
+            allow_variable_modifiers = self[ParserOptions.AllowVariableModifiers]
             while tokenizer.has_tokens:
                 token = tokenizer.token
-                if token == FunctionDefinition.declaration_keyword:
-                    document.add_function(self._get_function_definition(tokenizer))
-                elif token == VariableDefinition.declaration_keyword:
-                    document.add_global(self._get_variable_declaration(tokenizer))
-                elif token == TypeDefinition.declaration_keyword:
-                    document.add_type(self._get_type_definition(tokenizer))
-                elif token == ImportStatement.declaration_keyword:
+                token_type = token.type
+                if token_type is TokenType.Keyword_Function:
+                    document.add_function(self._get_function_definition(
+                        tokenizer,
+                        allow_modifiers=allow_function_modifiers,
+                        allow_variable_modifiers=allow_variable_modifiers
+                    ))
+                elif token_type is TokenType.Keyword_Variable:
+                    document.add_global(self._get_variable_declaration(tokenizer, allow_modifiers=allow_variable_modifiers))
+                elif token_type is TokenType.Keyword_Type:
+                    document.add_type(self._get_type_definition(
+                        tokenizer,
+                        allow_function_modifiers=allow_function_modifiers,
+                        allow_variable_modifiers=allow_variable_modifiers
+                    ))
+                elif token_type is TokenType.Keyword_Import:
                     document.add_import(self._get_import_statement(tokenizer))
                 else:
-                    raise UnexpectedTokenError(" or ".join(
-                        [
-                            VariableDefinition.declaration_keyword,
-                            FunctionDefinition.declaration_keyword,
-                            TypeDefinition.declaration_keyword,
-                            ImportStatement.declaration_keyword
-                        ]
-                    ), token)
+                    raise UnexpectedTokenError(_EXPECTED_DECLARATION, token)
 
         return document
 
@@ -231,7 +303,7 @@ if __name__ == '__main__':
             for func in typ.functions:
                 print(f"\tmethod {func.name}({', '.join(map(lambda p: f'{p.name}: {p.type}', func.parameters))}) [{' '.join(map(lambda x: x.value, func.modifiers))}] declared at line {func.keyword.line} {{")
                 for instruction in func.body:
-                    print(f"\t\t{instruction.name}", ", ".join(map(lambda x: f"{x.value}{f': {x.type}' if x.type else ''}", instruction.arguments)))
+                    print(f"\t\t{instruction.name}", ", ".join(map(lambda v, t: f"{v}{f': {t}' if t else ''}", instruction.argument_values, instruction.argument_types)))
                 print("\t}")
             print("}")
             print()
@@ -250,6 +322,6 @@ if __name__ == '__main__':
         for func in document.functions:
             print(f"function {func.name}({', '.join(map(lambda p: f'{p.name.value}: {p.type}', func.parameters))}) [{' '.join(map(lambda x: x.value, func.modifiers))}] declared at line {func.keyword.line} {{")
             for instruction in func.body:
-                print(f"\t{instruction.name}", ", ".join(map(lambda x: f"{x.value}{f': {x.type}' if x.type else ''}", instruction.arguments)))
+                print(f"\t{instruction.name}", ", ".join(map(lambda v, t: f"{v}{f': {t}' if t else ''}", instruction.argument_values, instruction.argument_types)))
             print('}')
             print()
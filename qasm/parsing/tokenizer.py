@@ -1,4 +1,7 @@
-from typing import Union, Set, Optional, Iterable
+import re
+import sys
+from bisect import bisect_right
+from typing import Union, Optional, Iterable, Pattern, List, Tuple
 
 try:
     from .itokenizer import *
@@ -16,16 +19,69 @@ __all__ = [
 ]
 
 
+# plain int masks of the options for the hot paths, `int & TokenizerOptions` goes through `IntFlag.__rand__`
+_EMIT_NEW_LINE = TokenizerOptions.EmitNewLine.value
+_SKIP_SPACES_BEFORE_EATING = TokenizerOptions.SkipSpacesBeforeEating.value
+_EMIT_WHITE_SPACE = TokenizerOptions.EmitWhiteSpace.value
+_EMIT_COMMENTS = TokenizerOptions.EmitComments.value
+_INCLUDE_COMMENT_CHARACTER = TokenizerOptions.IncludeCommentCharacter.value
+_INCLUDE_COMMENT_EOL = TokenizerOptions.IncludeCommentEOL.value
+_EMIT_KEYWORDS = TokenizerOptions.EmitKeywords.value
+
+_KEYWORDS = {
+    "func": TokenType.Keyword_Function,
+    "var": TokenType.Keyword_Variable,
+    "type": TokenType.Keyword_Type,
+    "import": TokenType.Keyword_Import
+}
+
+_IDENTIFIER_SPECIAL_CHARACTERS = "_$#%!@"
+_WHITE_SPACE_CHARACTERS = frozenset(" \t")
+
+# lookup table for ASCII characters, indexed by code point; other characters fall back to str.isalpha
+_ASCII_IDENTIFIER_FIRST_CHARACTERS = tuple(chr(i).isalpha() or chr(i) in _IDENTIFIER_SPECIAL_CHARACTERS for i in range(128))
+
+_IDENTIFIER_RE = re.compile(rf"[\w{re.escape(_IDENTIFIER_SPECIAL_CHARACTERS)}]*")
+_INTEGER10_RE = re.compile(r"-?[0-9]*")
+_INTEGER16_RE = re.compile(r"[0-9a-fA-F]*")
+_LINE_COMMENT_RE = re.compile(r"[^\n]*")
+
+_ESCAPES = {
+    'r': '\r',
+    't': '\t',
+    'n': '\n',
+    '\\': '\\',
+    '\'': '\''
+}
+
+_SINGLE_CHARACTER_TOKENS = {
+    ';': TokenType.SemiColon,
+    '(': TokenType.LeftCurvyBracket,
+    ')': TokenType.RightCurvyBracket,
+    '{': TokenType.LeftCurlyBracket,
+    '}': TokenType.RightCurlyBracket,
+    ',': TokenType.Comma,
+    ':': TokenType.Colon,
+    '*': TokenType.Asterisk,
+    '=': TokenType.Equal
+}
+
+
 class Tokenizer(ITokenizer):
     def __init__(self, source: str) -> None:
         super().__init__()
-        self._source = source
-        self._token = None
-        self._current = 0
-        self._line = self._last_line = 1
-        self._char = self._last_char = 1
-        self._chars_allowed_at_beginning_of_identifier: Set[str] = {'_', '$', '#', '%', '!', '@'}
-        self._chars_allowed_in_identifier: Set[str] = self._chars_allowed_at_beginning_of_identifier
+        self._source: str = source
+        self._token: Optional[Token] = None
+        # type of the current token, compared by identity instead of going through Token.__eq__
+        self._token_type: Optional[TokenType] = None
+        self._current: int = 0
+        self._token_start: int = 0
+        # offsets at which the lines of the source start, positions are looked up in it only when a token is created
+        self._line_starts: List[int] = [0]
+        line_end = source.find('\n')
+        while line_end != -1:
+            self._line_starts.append(line_end + 1)
+            line_end = source.find('\n', line_end + 1)
 
     @property
     def current_char(self) -> str:
@@ -36,7 +92,7 @@ class Tokenizer(ITokenizer):
 
     @property
     def has_tokens(self) -> bool:
-        return self._current >= 0 and self._token != TokenType.EOF
+        return self._current >= 0 and self._token_type is not TokenType.EOF
 
     @property
     def next_char(self) -> str:
@@ -50,207 +106,181 @@ class Tokenizer(ITokenizer):
         return self._token
 
     def _create_token(self, typ: TokenType, value: str) -> Token:
-        self._token = Token(self._last_line, self._last_char, typ, value)
-        self._last_line = self._line
-        self._last_char = self._char
+        line, char = self._get_position(self._token_start)
+        self._token = Token(line, char, typ, value)
+        self._token_type = typ
         return self._token
 
     def _create_unexpected_character_error(self, expected: Union[str, TokenType]) -> UnexpectedCharacterError:
         if isinstance(expected, TokenType):
             expected = expected.name
-        return UnexpectedCharacterError(expected, self.current_char, self._line, self._char)
+        return UnexpectedCharacterError(expected, self.current_char, *self._get_position(self._current))
+
+    def _get_match(self, pattern: Pattern[str]) -> str:
+        match = pattern.match(self._source, self._current)
+        self._current = match.end()
+        return match.group()
+
+    def _get_position(self, offset: int) -> Tuple[int, int]:
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
 
     def _get_identifier(self) -> str:
-        if self._is_identifier_first_character(self.current_char):
-            buffer = []
-        else:
-            raise self._create_unexpected_character_error(TokenType.Identifier)
-        while self._is_identifier_character(self.current_char):
-            buffer.append(self.get_current_char())
-        return "".join(buffer)
+        # advance() already checked the first character
+        # identifiers repeat a lot (instructions, names, types), keep a single string object for each
+        return sys.intern(self._get_match(_IDENTIFIER_RE))
 
     def _get_integer10(self) -> str:
-        buffer = []
-        if self.current_char == '-':
-            buffer.append(self.get_current_char())
-        while '0' <= self.current_char <= '9':
-            buffer.append(self.get_current_char())
-        return "".join(buffer)
+        return self._get_match(_INTEGER10_RE)
 
     def _get_integer16(self) -> str:
-        buffer = []
-        while '0' <= self.current_char <= '9' or 'a' <= self.current_char.lower() <= 'f':
-            buffer.append(self.get_current_char())
-        return "".join(buffer)
+        return self._get_match(_INTEGER16_RE)
 
     def _get_line_comment(self) -> str:
-        buffer = []
-        try:
-            while self.current_char != '\n':
-                buffer.append(self.get_current_char())
-            if self[TokenizerOptions.IncludeCommentEOL]:
-                buffer.append(self.get_current_char())
-        except IndexError:
-            ...
-        return "".join(buffer)
+        comment = self._get_match(_LINE_COMMENT_RE)
+        if self._options & _INCLUDE_COMMENT_EOL and self.current_char == '\n':
+            comment += self.get_current_char()
+        return comment
 
     def _get_number(self) -> str:
-        buffer = []
-        left = self._get_integer10()
-        if not left:
-            if self.current_char != '.':
-                raise self._create_unexpected_character_error('.')
-        else:
-            buffer.append(left)
+        start = self._current
+        if not self._get_integer10() and self.current_char != '.':
+            raise self._create_unexpected_character_error('.')
         if self.current_char == '.':
-            buffer.append(self.get_current_char())
-            right = self._get_integer10()
-            if right:
-                buffer.append(right)
-        return "".join(buffer)
-
-    def _is_identifier_character(self, c: str) -> bool:
-        return c.isalnum() or c in self._chars_allowed_in_identifier
-
-    def _is_identifier_first_character(self, c: str) -> bool:
-        return c.isalpha() or c in self._chars_allowed_at_beginning_of_identifier
-
-    def _next_char(self, c: str) -> None:
-        if c == '\n':
-            self._line += 1
-            self._char = 0
-        elif c == '\r':
-            self._char = 0
-        self._char += 1
+            self._current += 1
+            self._get_integer10()
+        return self._source[start:self._current]
 
-    def _next_string(self, s: str) -> None:
-        list(map(self._next_char, s))
+    @staticmethod
+    def _is_identifier_first_character(c: str) -> bool:
+        if c.isascii():
+            return c != "" and _ASCII_IDENTIFIER_FIRST_CHARACTERS[ord(c)]
+        return c.isalpha()
 
     def advance(self) -> Token:
-        self._token = None
-        while self.has_tokens:
-            char = self.current_char
-
-            if not char:
+        self._token = self._token_type = None
+
+        # skip everything that isn't emitted as a token, working on locals and storing the position once
+        source = self._source
+        length = len(source)
+        options = self._options
+        current = self._current
+        while current < length:
+            char = source[current]
+            if char == '\n':
+                if options & _EMIT_NEW_LINE:
+                    break
+                current += 1
+            elif char in _WHITE_SPACE_CHARACTERS:
+                if options & _EMIT_WHITE_SPACE:
+                    break
+                current += 1
+            elif char == '/' and source.startswith('/', current + 1) and not options & _EMIT_COMMENTS:
+                end = source.find('\n', current)
+                current = length if end == -1 else end + 1
+            else:
                 break
+        self._current = self._token_start = current
 
-            if char == '\n':
-                if self[TokenizerOptions.EmitNewLine]:
-                    return self._create_token(TokenType.NewLine, self.get_current_char())
-                else:
-                    self._create_token(TokenType.NewLine, self.get_current_char())
-                    continue
+        if current >= length:
+            return self._create_token(TokenType.EOF, "<EOF>")
 
-            if char in {' ', '\t'}:
-                if self[TokenizerOptions.EmitWhiteSpace]:
-                    return self._create_token(TokenType.WhiteSpace, self.get_current_char())
-                else:
-                    self._create_token(TokenType.WhiteSpace, self.get_current_char())
-                    continue
-
-            if char == '/' and self.next_char == '/':
-                if self[TokenizerOptions.EmitComments]:
-                    if not self[TokenizerOptions.IncludeCommentCharacter]:
-                        self.get_current_char()
-                        self.get_current_char()
-                    return self._create_token(TokenType.Comment, self._get_line_comment())
-                else:
-                    while self.get_current_char() != '\n':
-                        ...
-                continue
-            if char == ';':
-                return self._create_token(TokenType.SemiColon, self.get_current_char())
-            if char == '(':
-                return self._create_token(TokenType.LeftCurvyBracket, self.get_current_char())
-            if char == ')':
-                return self._create_token(TokenType.RightCurvyBracket, self.get_current_char())
-            if char == '{':
-                return self._create_token(TokenType.LeftCurlyBracket, self.get_current_char())
-            if char == '}':
-                return self._create_token(TokenType.RightCurlyBracket, self.get_current_char())
-            if char == ',':
-                return self._create_token(TokenType.Comma, self.get_current_char())
-            if char == '.':
-                if self.next_char.isdigit():
-                    return self._create_token(TokenType.Literal_Float, self._get_number())
-                return self._create_token(TokenType.Dot, self.get_current_char())
-            if char == ':':
-                return self._create_token(TokenType.Colon, self.get_current_char())
-            if char == '*':
-                return self._create_token(TokenType.Asterisk, self.get_current_char())
-            if char == '=':
-                return self._create_token(TokenType.Equal, self.get_current_char())
-            if char == '\'':
-                self.get_current_char()
-                char = self.get_current_char()
-                if char == "\\":
-                    escaped = self._get_special_character(self.current_char)
-                    if escaped:
-                        char = escaped
-                if self.get_current_char() != '\'':
-                    raise self._create_unexpected_character_error('\'')
-                return self._create_token(TokenType.Literal_Char, char)
-            if char == '\"':
-                self.get_current_char()
-                buffer = []
-                while self.current_char != '\"':
-                    char = self.get_current_char()
-                    if char == "\\":
-                        if self.current_char == 'x':
-                            self.get_current_char()
-                            buffer.append(chr(int(self.get_current_char() + self.get_current_char(), base=16)))
-                            continue
-                        escaped = self._get_special_character(self.current_char)
-                        if escaped:
-                            char = escaped
-                            self._current += 1
-                    buffer.append(char)
+        if char == '\n':
+            return self._create_token(TokenType.NewLine, self.get_current_char())
+        if char in _WHITE_SPACE_CHARACTERS:
+            return self._create_token(TokenType.WhiteSpace, self.get_current_char())
+
+        token_type = _SINGLE_CHARACTER_TOKENS.get(char)
+        if token_type is not None:
+            self._current += 1
+            return self._create_token(token_type, char)
+
+        if char == '/' and source.startswith('/', current + 1):
+            if not options & _INCLUDE_COMMENT_CHARACTER:
                 self.get_current_char()
-                return self._create_token(TokenType.Literal_String, "".join(buffer))
-            if char == '\\':
                 self.get_current_char()
-                if self.get_current_char() == 'x':
-                    return self._create_token(TokenType.Literal_Hex, self._get_integer16())
-                raise self._create_unexpected_character_error('x')
-            if char.isdigit() or char == '-':
-                number = self._get_number()
-                return self._create_token(TokenType.Literal_Float if '.' in number else TokenType.Literal_Int, number)
-            if self._is_identifier_first_character(char):
-                return self._create_token(TokenType.Identifier, self._get_identifier())
-
-            raise self._create_unexpected_character_error(f"not \"{char}\"")
-        return self._create_token(TokenType.EOF, "<EOF>")
+            return self._create_token(TokenType.Comment, self._get_line_comment())
+        if char == '.':
+            if self.next_char.isdigit():
+                return self._create_token(TokenType.Literal_Float, self._get_number())
+            self._current += 1
+            return self._create_token(TokenType.Dot, char)
+        if char == '\'':
+            self.get_current_char()
+            char = self.get_current_char()
+            if char == "\\":
+                escaped = _ESCAPES.get(self.current_char)
+                if escaped:
+                    char = escaped
+            if self.get_current_char() != '\'':
+                raise self._create_unexpected_character_error('\'')
+            return self._create_token(TokenType.Literal_Char, char)
+        if char == '\"':
+            self.get_current_char()
+            end = source.find('\"', self._current)
+            if end == -1:
+                self._current = length
+                raise self._create_unexpected_character_error('\"')
+            if source.find('\\', self._current, end) == -1:
+                string = source[self._current:end]
+                self._current = end + 1
+                return self._create_token(TokenType.Literal_String, string)
+            # copy the runs between escapes as slices instead of character by character
+            buffer = []
+            start = self._current
+            escape = source.find('\\', start, end)
+            while escape != -1:
+                buffer.append(source[start:escape])
+                char = source[escape + 1]
+                if char == 'x':
+                    buffer.append(chr(int(source[escape + 2:escape + 4], base=16)))
+                    start = escape + 4
+                else:
+                    escaped = _ESCAPES.get(char)
+                    if escaped:
+                        buffer.append(escaped)
+                        start = escape + 2
+                    else:
+                        buffer.append('\\')
+                        start = escape + 1
+                escape = source.find('\\', start, end)
+            buffer.append(source[start:end])
+            self._current = end + 1
+            return self._create_token(TokenType.Literal_String, "".join(buffer))
+        if char == '\\':
+            self.get_current_char()
+            if self.get_current_char() == 'x':
+                return self._create_token(TokenType.Literal_Hex, self._get_integer16())
+            raise self._create_unexpected_character_error('x')
+        if char.isdigit() or char == '-':
+            number = self._get_number()
+            return self._create_token(TokenType.Literal_Float if '.' in number else TokenType.Literal_Int, number)
+        if self._is_identifier_first_character(char):
+            identifier = self._get_identifier()
+            if options & _EMIT_KEYWORDS:
+                return self._create_token(_KEYWORDS.get(identifier, TokenType.Identifier), identifier)
+            return self._create_token(TokenType.Identifier, identifier)
+
+        raise self._create_unexpected_character_error(f"not \"{char}\"")
 
     def eat(self, value: Union[TokenType, str]) -> Token:
-        if self[TokenizerOptions.SkipSpacesBeforeEating]:
+        if self._options & _SKIP_SPACES_BEFORE_EATING:
             with self.options(TokenizerOptions.EmitWhiteSpace):
-                while self._token == TokenType.WhiteSpace:
+                while self._token_type is TokenType.WhiteSpace:
                     self.advance()
-        if self._token != value:
+        if isinstance(value, TokenType):
+            matches = self._token_type is value
+        else:
+            matches = self._token == value
+        if not matches:
             raise UnexpectedTokenError(value, self._token)
         return self.advance()
 
     def get_current_char(self) -> str:
         char = self.current_char
-        self._next_char(char)
         self._current += 1
         return char
 
-    @staticmethod
-    def _get_special_character(c: str) -> Optional[str]:
-        if c == 'r':
-            return '\r'
-        elif c == 't':
-            return '\t'
-        elif c == 'n':
-            return '\n'
-        elif c == '\\':
-            return c
-        elif c == '\'':
-            return c
-        else:
-            return None
-
     def __iter__(self) -> Iterable[Token]:
         while self.has_tokens:
             yield self.advance()
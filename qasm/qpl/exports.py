@@ -1,10 +1,12 @@
+from functools import lru_cache
 from io import BytesIO
-from struct import pack
-from typing import BinaryIO, Collection, Dict
+from struct import Struct
+from typing import BinaryIO, Collection, Dict, List
 
 from qasm.asm.old.bin_types import Void, TYPES, TypeMeta, Int
 
 from qasm.asm.old.function import FunctionReference
+from qasm.qpl.file import FileFormatError
 
 
 __all__ = [
@@ -13,37 +15,85 @@ __all__ = [
 ]
 
 
+@lru_cache(maxsize=64)
+def _entry_struct(num_params: int) -> Struct:
+    return Struct(f"P b {num_params}b b b")
+
+
+def _read_until(io: BinaryIO, terminator: bytes, chunk_size: int = 64) -> bytes:
+    """
+    Reads `io` up to and including the (single byte) terminator.
+
+    Buffered streams are peeked into and only the bytes up to the terminator
+    are consumed, other seekable streams are read in chunks and seeked back to
+    right after the terminator, anything else (e.g. a raw pipe) is read byte by byte.
+
+    :return: The bytes before the terminator.
+    """
+    peek = getattr(io, "peek", None)
+    seekable = peek is None and io.seekable()
+    chunks = []
+    while True:
+        if peek is not None:
+            chunk = peek(chunk_size)
+        else:
+            chunk = io.read(chunk_size if seekable else 1)
+        if not chunk:
+            raise FileFormatError(f"Unexpected end of data, expected {terminator}")
+        end = chunk.find(terminator)
+        if end == -1:
+            if peek is not None:
+                io.read(len(chunk))
+            chunks.append(chunk)
+            continue
+        chunks.append(chunk[:end])
+        if peek is not None:
+            io.read(end + 1)
+        elif seekable:
+            io.seek(end + 1 - len(chunk), 1)
+        return b"".join(chunks)
+
+
 class ExportTableEntry(FunctionReference):
     def __init__(self, name: str, offset: int, return_type: TypeMeta, parameters: Collection[TypeMeta], num_locals: int):
         super().__init__(name, offset, return_type, parameters, num_locals)
 
-    def to_bytes(self):
-        return self._name.encode("ascii") + b'\0' + pack(
-            f"P b {self.num_params}b b b",
+    def size(self) -> int:
+        return len(self._name) + 1 + _entry_struct(self.num_params).size
+
+    def pack_into(self, buffer: bytearray, offset: int) -> int:
+        """
+        Writes the entry into `buffer` at `offset`, which must have room for `size()` bytes.
+
+        :return: The offset right after the entry.
+        """
+        name = self._name.encode("ascii")
+        end = offset + len(name)
+        buffer[offset:end] = name
+        buffer[end] = 0
+        struct = _entry_struct(self.num_params)
+        struct.pack_into(
+            buffer,
+            end + 1,
             self._offset,
             self._return_type.index(),
-            *tuple(map(lambda x: x.index(), self.parameter_types)),
+            *[parameter.index() for parameter in self.parameter_types],
             Void.index(),
             self.num_locals
         )
+        return end + 1 + struct.size
+
+    def to_bytes(self):
+        data = bytearray(ExportTableEntry.size(self))
+        ExportTableEntry.pack_into(self, data, 0)
+        return bytes(data)
 
     @classmethod
     def from_binary_io(cls, io: BinaryIO):
-        name = []
-        while True:
-            char = io.read(1)
-            if char == b'\0':
-                break
-            name.append(char)
-        name = b"".join(name).decode("ascii")
+        name = _read_until(io, b'\0').decode("ascii")
         offset = Int.from_bytes(io.read(Int.size))
         return_type = TYPES[Int.from_bytes(io.read(1))]
-        parameters = []
-        while True:
-            parameter = TYPES[Int.from_bytes(io.read(1))]
-            if parameter is Void:
-                break
-            parameters.append(parameter)
+        parameters = [TYPES[index] for index in _read_until(io, bytes([Void.index()]))]
         num_locals = Int.from_bytes(io.read(1))
         return cls(name, offset, return_type, parameters, num_locals)
 
@@ -55,22 +105,24 @@ class ExportTableEntry(FunctionReference):
 class ExportTable:
     def __init__(self):
         self._exports: Dict[str, FunctionReference] = {}
+        self._order: List[FunctionReference] = []
 
     def add_export(self, export: FunctionReference):
         if export.name in self._exports:
             raise KeyError(f"Function \"{export.name}\" is already exported")
         self._exports[export.name] = export
+        self._order.append(export)
 
     def get_export(self, name: str):
         return self._exports[name]
 
     def to_bytes(self):
-        return b"".join([
-            Int.to_bytes(len(self._exports)),
-            *tuple(map(
-                ExportTableEntry.to_bytes, self._exports.values()
-            ))
-        ])
+        data = bytearray(Int.size + sum(map(ExportTableEntry.size, self._order)))
+        data[:Int.size] = Int.to_bytes(len(self._order))
+        offset = Int.size
+        for export in self._order:
+            offset = ExportTableEntry.pack_into(export, data, offset)
+        return bytes(data)
 
     @classmethod
     def from_binary_io(cls, io: BinaryIO):
@@ -1,21 +1,28 @@
+import mmap
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntFlag
-from io import BytesIO
 from struct import Struct
-from typing import Dict, BinaryIO, Union, Optional, SupportsInt
+from typing import Dict, BinaryIO, Union, Optional, SupportsInt, Iterable, List, Tuple
 
 
 __all__ = [
     "FileFormatError",
+    "QPL_IO_BUFFER",
     "Header",
     "QPLFile",
     "QPLFlags",
     "SectionTable",
     "SectionTableEntry",
-    "read_file"
+    "read_file",
+    "read_files"
 ]
 
 
+# buffer size used when opening QPL files for reading or writing
+QPL_IO_BUFFER = 1 << 20
+
+
 class FileFormatError(Exception):
     ...
 
@@ -25,12 +32,10 @@ class QPLFlags(IntFlag):
     HasExports = 1 << 1
     RelativeAddressing = 1 << 2
 
-    def __getitem__(self, item):
-        if type(item) is str:
-            return type(self)[item]
-
 
 class ArchitectureInfo:
+    __slots__ = ("_system_word_size", "_is_little_endian", "_architecture")
+
     ARCHITECTURE_MASK = 0x7F
     BYTE_ORDER_MASK = 0x80
 
@@ -38,19 +43,15 @@ class ArchitectureInfo:
 
     def __init__(self, arch: SupportsInt, little_endian: Optional[bool] = None) -> None:
         arch = int(arch)
-        if not isinstance(arch, int):
-            raise TypeError(f"arch must be an {int.__name__}, not a {type(arch).__name__}")
         if arch == 0:
             raise ValueError(f"arch must not be 0")
         if little_endian:
-            if not isinstance(little_endian, bool):
-                raise TypeError(f"little_endian must be a {bool.__name__}, not a {type(little_endian).__name__}")
             self._system_word_size = arch
             self._is_little_endian = little_endian
         else:
             # MSB indicates byte order (0 = little-endian, 1 = big-endian)
             self._system_word_size = arch & self.ARCHITECTURE_MASK
-            self._is_little_endian = (arch & self.BYTE_ORDER_MASK) == 0
+            self._is_little_endian = not arch & self.BYTE_ORDER_MASK
         self._architecture = 8 * self._system_word_size
 
     @property
@@ -74,7 +75,7 @@ class ArchitectureInfo:
         return cls(cls.NATIVE_SIZE, sys.byteorder == "little")
 
     def __int__(self) -> int:
-        return (self.is_big_endian & self.BYTE_ORDER_MASK) | (self._system_word_size & self.ARCHITECTURE_MASK)
+        return (0 if self._is_little_endian else self.BYTE_ORDER_MASK) | (self._system_word_size & self.ARCHITECTURE_MASK)
 
     def __str__(self) -> str:
         return f"{self._architecture} bit, {'big' if self.is_big_endian else 'little'}-endian"
@@ -108,7 +109,9 @@ class Header:
     -- 4 byte mark (total 16 bytes)
 
     for a total of a 16-byte header"""
-    FORMAT = "4s b b b x h h 4x"
+    __slots__ = ("_flags", "_architecture", "_num_sections", "_version")
+
+    FORMAT = "4s b B b x h h 4x"
     STRUCT = Struct(FORMAT)
     SIGNATURE = b"QPL\0"
 
@@ -140,11 +143,21 @@ class Header:
     def to_bytes(self):
         return self.STRUCT.pack(self.SIGNATURE, self._flags, int(self._architecture), self._num_sections, *self._version)
 
+    def pack_into(self, buffer: bytearray, offset: int) -> None:
+        self.STRUCT.pack_into(buffer, offset, self.SIGNATURE, self._flags, int(self._architecture), self._num_sections, *self._version)
+
     @classmethod
     def from_bytes(cls, data: bytes):
-        if len(data) < cls.STRUCT.size:
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer, offset: int = 0):
+        """
+        Unpacks the header at `offset` of `buffer` (any object supporting the buffer protocol) without copying it.
+        """
+        if len(buffer) - offset < cls.STRUCT.size:
             raise ValueError(f"len(data) must be >= {cls.STRUCT.size}")
-        signature, *args = cls.STRUCT.unpack(data)
+        signature, *args = cls.STRUCT.unpack_from(buffer, offset)
         if signature != cls.SIGNATURE:
             raise ValueError(f"Signature must be {cls.SIGNATURE}, but it was {signature}")
         return cls(*args)
@@ -154,11 +167,12 @@ class Header:
         return cls.from_bytes(io.read(cls.STRUCT.size))
 
     def __str__(self):
+        flags = self._flags
         return '\n'.join((
             "[QPL Header]",
-            f"Flags: {self.flags}",
+            f"Flags: {flags}",
             f"Architecture: {self._architecture}",
-            '\n'.join(map(lambda flag: f"[Flag] {flag.name}: {self.has_flag(flag)}", QPLFlags)),
+            '\n'.join([f"[Flag] {flag.name}: {bool(flags & flag)}" for flag in QPLFlags]),
             f"Section Count: {self.num_sections}",
             f"Language Version: {'.'.join(map(str, self._version))}"
         ))
@@ -170,19 +184,39 @@ class SectionTableEntry:
     Size (4 bytes) - size of the section
     Offset (4 bytes) - 4 byte relative address of the section
     """
+    __slots__ = ("_name", "_name_bytes", "_size", "_offset")
+
     MAX_SECTION_NAME_LENGTH = 8
     FORMAT = f"{MAX_SECTION_NAME_LENGTH}s i i"
     STRUCT = Struct(FORMAT)
+    _pack = STRUCT.pack
+    _pack_into = STRUCT.pack_into
 
     def __init__(self, name: str, size: int, offset: int):
         if len(name) > self.MAX_SECTION_NAME_LENGTH:
             raise IndexError(f"Name of section must be <= {self.MAX_SECTION_NAME_LENGTH} (was \"{name}\", len={len(name)})")
         self._name = name
+        self._name_bytes = name.encode("ascii")
         self._size = size
         self._offset = offset
 
+    @classmethod
+    def _from_name_bytes(cls, name_bytes: bytes, size: int, offset: int):
+        """
+        Creates an entry from the padded name as it is stored in the section table,
+        the name is only decoded when it's accessed.
+        """
+        entry = cls.__new__(cls)
+        entry._name = None
+        entry._name_bytes = name_bytes
+        entry._size = size
+        entry._offset = offset
+        return entry
+
     @property
     def name(self):
+        if self._name is None:
+            self._name = self._name_bytes.strip(b"\0").decode("ascii")
         return self._name
 
     @property
@@ -193,16 +227,27 @@ class SectionTableEntry:
     def offset(self):
         return self._offset
 
+    def set_offset(self, offset: int) -> None:
+        self._offset = offset
+
     def to_bytes(self):
-        return self.STRUCT.pack(self._name.encode("ascii"), self._size, self._offset)
+        return self._pack(self._name_bytes, self._size, self._offset)
+
+    def pack_into(self, buffer: bytearray, offset: int) -> None:
+        self._pack_into(buffer, offset, self._name_bytes, self._size, self._offset)
 
     @classmethod
     def from_bytes(cls, data: bytes):
-        if len(data) < cls.STRUCT.size:
+        return cls.from_buffer(data)
+
+    @classmethod
+    def from_buffer(cls, buffer, offset: int = 0):
+        """
+        Unpacks the entry at `offset` of `buffer` (any object supporting the buffer protocol) without copying it.
+        """
+        if len(buffer) - offset < cls.STRUCT.size:
             raise FileFormatError(f"len(data) must be >= {cls.STRUCT.size}")
-        name, *args = cls.STRUCT.unpack(data)
-        name = name.decode("ascii").strip("\0")
-        return cls(name, *args)
+        return cls._from_name_bytes(*cls.STRUCT.unpack_from(buffer, offset))
 
     @classmethod
     def from_binary_io(cls, io: BinaryIO):
@@ -211,13 +256,15 @@ class SectionTableEntry:
     def __str__(self):
         return '\n'.join((
             f"[Section Entry]",
-            f"Section Name: {self._name}",
+            f"Section Name: {self.name}",
             f"Section Size: {self._size}",
             f"Section Offset: {self._offset}"
         ))
 
 
 class SectionTable:
+    __slots__ = ("_entries",)
+
     def __init__(self):
         self._entries: Dict[str, SectionTableEntry] = {}
 
@@ -248,14 +295,27 @@ class SectionTable:
         return self.get_entry(item)
 
     def to_bytes(self):
-        return sum(map(SectionTableEntry.to_bytes, self._entries.values()), b"")
+        pack = SectionTableEntry.STRUCT.pack
+        return b"".join([pack(entry._name_bytes, entry._size, entry._offset) for entry in self._entries.values()])
+
+    def pack_into(self, buffer: bytearray, offset: int) -> None:
+        entry_size = SectionTableEntry.STRUCT.size
+        for entry in self._entries.values():
+            entry.pack_into(buffer, offset)
+            offset += entry_size
 
 
 class QPLFile:
+    __slots__ = ("_header", "_section_table", "_sections", "_sections_size", "_mmap")
+
     def __init__(self, header: Optional[Header] = None):
         self._header = header
         self._section_table = SectionTable()
-        self._sections: Dict[str, bytes] = {}
+        self._sections: Dict[str, Union[bytes, memoryview]] = {}
+        # total size of the sections as of the last calculate_section_offsets
+        self._sections_size = 0
+        # the mapping the sections are views of when the file was read with from_mmap
+        self._mmap: Optional[mmap.mmap] = None
 
     @property
     def header(self):
@@ -277,7 +337,7 @@ class QPLFile:
     def raw_data(self):
         return b"".join(self._sections.values())
 
-    def add_section(self, name: str, data: bytes):
+    def add_section(self, name: str, data: Union[bytes, bytearray, memoryview]):
         if not name:
             raise ValueError(f"name can't be empty")
         if len(name) > SectionTableEntry.MAX_SECTION_NAME_LENGTH:
@@ -288,55 +348,180 @@ class QPLFile:
         self._section_table.add_entry(SectionTableEntry(name, len(data), 0))
 
     def calculate_section_offsets(self):
-        offset = Header.STRUCT.size + SectionTableEntry.STRUCT.size * len(self._sections)
+        start = offset = Header.STRUCT.size + SectionTableEntry.STRUCT.size * len(self._sections)
+        entries = self._section_table._entries
         for name, data in self._sections.items():
-            entry = SectionTableEntry(name, len(data), offset)
-            self._section_table.set_entry(entry)
-            offset += entry.size
-
-    def to_bytes(self, *header_options):
-        data = bytearray()
-
+            size = len(data)
+            entry = entries.get(name)
+            # only sections that were changed through `sections` need a new entry
+            if entry is None or entry.size != size:
+                entries[name] = SectionTableEntry(name, size, offset)
+            else:
+                entry.set_offset(offset)
+            offset += size
+        self._sections_size = offset - start
+
+    def _file_total_size(self) -> int:
+        return Header.STRUCT.size + SectionTableEntry.STRUCT.size * len(self._sections) + self._sections_size
+
+    def _pack_header_and_table(self, header_options, include_sections: bool = False) -> bytearray:
+        """
+        Creates the header and updates the section offsets, then packs them into
+        a new buffer. If `include_sections` is true, the buffer has the size of
+        the whole file, leaving room for the sections after the section table.
+        """
         self._header = Header(*header_options, len(self._sections), 1, 0)
-        data.extend(self._header.to_bytes())
 
         self.calculate_section_offsets()
 
-        for entry in self._section_table.entries:
-            data.extend(entry.to_bytes())
+        if include_sections:
+            data = bytearray(self._file_total_size())
+        else:
+            data = bytearray(Header.STRUCT.size + SectionTableEntry.STRUCT.size * len(self._sections))
+        self._header.pack_into(data, 0)
+        self._section_table.pack_into(data, Header.STRUCT.size)
+        return data
+
+    def to_bytes(self, *header_options):
+        data = self._pack_header_and_table(header_options, True)
 
+        offset = len(data) - self._sections_size
         for section_data in self._sections.values():
-            data.extend(section_data)
+            end = offset + len(section_data)
+            data[offset:end] = section_data
+            offset = end
 
         return bytes(data)
 
     def write(self, path: str, *header_options):
-        with open(path, "wb") as dst:
+        with open(path, "wb", buffering=QPL_IO_BUFFER) as dst:
             self.write_to(dst, *header_options)
 
     def write_to(self, io: BinaryIO, *header_options):
-        io.write(self.to_bytes(*header_options))
+        # the sections are written as they are instead of being copied into one buffer with the rest of the file
+        io.write(self._pack_header_and_table(header_options))
+        for section_data in self._sections.values():
+            io.write(section_data)
 
     @classmethod
     def from_bytes(cls, data: bytes):
-        return cls.from_binary_io(BytesIO(data))
+        return cls.from_buffer(data, copy=True)
+
+    @classmethod
+    def from_buffer(cls, buffer, *, copy: bool = False):
+        """
+        Parses a file from `buffer` (any object supporting the buffer protocol) in place.
+        Unless `copy` is true, the sections are `memoryview`s of the buffer instead of
+        `bytes` copied out of it, so changes to the buffer show in the file and the buffer
+        can't be resized while they are alive.
+        """
+        view = memoryview(buffer)
+
+        header = Header.from_buffer(view)
+        file = cls(header)
+
+        table_start = Header.STRUCT.size
+        table_size = SectionTableEntry.STRUCT.size * max(header.num_sections, 0)
+        table = view[table_start:table_start + table_size]
+        if len(table) < table_size:
+            raise FileFormatError(f"Section table must be {table_size} bytes, but only {len(table)} were read")
+
+        for name, size, offset in SectionTableEntry.STRUCT.iter_unpack(table):
+            # negative offsets would wrap around the buffer instead of failing
+            if offset < 0 or size < 0 or offset + size > len(view):
+                raise FileFormatError(f"Section at offset {offset} with size {size} is outside of the data ({len(view)} bytes)")
+            data = view[offset:offset + size]
+            file.add_section(name.decode("ascii").strip("\0"), data.tobytes() if copy else data)
+
+        file.calculate_section_offsets()
+
+        return file
 
     @classmethod
     def from_binary_io(cls, io: BinaryIO):
         header = Header.from_binary_io(io)
         file = QPLFile(header)
 
-        entries = [SectionTableEntry.from_binary_io(io) for _ in range(header.num_sections)]
-
-        for entry in entries:
-            io.seek(entry.offset)
-            section_data = io.read(entry.size)
-            file.add_section(entry.name, section_data)
+        table_size = SectionTableEntry.STRUCT.size * max(header.num_sections, 0)
+        table = io.read(table_size)
+        if len(table) < table_size:
+            raise FileFormatError(f"Section table must be {table_size} bytes, but only {len(table)} were read")
+        entries = list(SectionTableEntry.STRUCT.iter_unpack(table))
+
+        if entries:
+            start = min(offset for _, _, offset in entries)
+            # the offsets aren't validated, never read past the end of the stream
+            end = min(max(offset + size for _, size, offset in entries), io.seek(0, 2))
+            sizes = [size for _, size, _ in entries]
+            if min(sizes) >= 0 and end - start <= min(2 * sum(sizes), QPL_IO_BUFFER):
+                # the sections are small and (nearly) contiguous, read them all at once; bigger
+                # spans are read section by section so each section's data is only copied once
+                io.seek(start)
+                payload = io.read(max(end - start, 0))
+                for name, size, offset in entries:
+                    file.add_section(name.decode("ascii").strip("\0"), payload[offset - start:offset - start + size])
+            else:
+                for name, size, offset in entries:
+                    io.seek(offset)
+                    file.add_section(name.decode("ascii").strip("\0"), io.read(size))
 
         file.calculate_section_offsets()
 
         return file
 
+    @classmethod
+    def from_mmap(cls, path: str):
+        """
+        Reads the file at `path` by mapping it into memory, the sections are
+        `memoryview`s of the mapping instead of copies of the file's data.
+
+        The mapping (and its file descriptor) stays open until `close()` is called,
+        use the returned file as a context manager to close it. The file at `path`
+        must not be modified while it is mapped, this includes writing the returned
+        file back to the same path.
+        """
+        with open(path, "rb") as src:
+            # the mapping stays valid after the file is closed
+            mapping = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            file = cls.from_buffer(mapping)
+        except BaseException:
+            mapping.close()
+            raise
+        file._mmap = mapping
+        return file
+
+    def close(self) -> None:
+        """
+        Closes the mapping of a file read with `from_mmap`, its sections can't be used afterwards.
+        If views of the sections are still held elsewhere, the mapping is closed once they are
+        garbage collected instead. Does nothing for other files or files that are already closed.
+        """
+        mapping = self._mmap
+        if mapping is None:
+            return
+        self._mmap = None
+        for data in self._sections.values():
+            if not isinstance(data, memoryview):
+                continue
+            try:
+                obj = data.obj
+            except ValueError:
+                # the view was already released
+                continue
+            if obj is mapping:
+                data.release()
+        try:
+            mapping.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def __str__(self):
         return (
             f"[QPL File]\n" +
@@ -347,10 +532,39 @@ class QPLFile:
 
 
 def read_file(path: str):
-    with open(path, "rb") as src:
+    with open(path, "rb", buffering=QPL_IO_BUFFER) as src:
         return QPLFile.from_binary_io(src)
 
 
+def _read_header_and_table(path: str) -> Tuple[Header, List[SectionTableEntry]]:
+    # the number of sections is a signed byte, so a single read always covers the whole table
+    with open(path, "rb") as src:
+        data = src.read(Header.STRUCT.size + SectionTableEntry.STRUCT.size * 127)
+    header = Header.from_buffer(data)
+    table_start = Header.STRUCT.size
+    table_size = SectionTableEntry.STRUCT.size * max(header.num_sections, 0)
+    table = memoryview(data)[table_start:table_start + table_size]
+    if len(table) < table_size:
+        raise FileFormatError(f"Section table must be {table_size} bytes, but only {len(table)} were read")
+    return header, [SectionTableEntry._from_name_bytes(*fields) for fields in SectionTableEntry.STRUCT.iter_unpack(table)]
+
+
+def read_files(paths: Iterable[str], max_workers: int = 8, headers_only: bool = False):
+    """
+    Reads the files at `paths` on a pool of threads, overlapping the I/O of the files.
+    The files are read with `read_file`, which copies their data, so no file stays open
+    after it was read.
+
+    :param paths: The paths of the files to read.
+    :param max_workers: The maximum number of files that are read at the same time.
+    :param headers_only: Whether to read only the header and section table of each file, skipping the sections.
+    :return: A list of the read `QPLFile`s in the order of `paths`, or of (`Header`, list of `SectionTableEntry`) tuples if `headers_only` is true.
+    """
+    read = _read_header_and_table if headers_only else read_file
+    with ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(read, paths))
+
+
 if __name__ == '__main__':
     print("Native Architecture Info:", ArchitectureInfo.get_native_architecture_info(), '\n')
     with open("../../tests/test2.qpl", "rb") as src: